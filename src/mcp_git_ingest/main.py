@@ -1,14 +1,22 @@
 """GitHub repository analysis tools."""
 
 from fastmcp import FastMCP
+import asyncio
 import os
+import posixpath
 import subprocess
-from typing import List
+from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
 import tempfile
 import shutil
 from pathlib import Path
+from functools import lru_cache
 import hashlib
+import re
 import git
+from openai import OpenAI
+
+from .consts import DEFAULT_SUMMARY_PROMPT
 
 mcp = FastMCP(
     "GitHub Tools",
@@ -17,73 +25,347 @@ mcp = FastMCP(
     ]
 )
 
-def clone_repo(repo_url: str, commit_hash: str = None) -> str:
-    """Clone a repository and optionally checkout a specific commit. Return the path."""
-    repo_hash = hashlib.sha256((repo_url + (commit_hash or "")).encode()).hexdigest()[:12]
+def clone_repo(repo_url: str, commit_hash: str = None, bare: bool = False) -> str:
+    """Clone a repository and optionally checkout a specific commit. Return the path.
+
+    Bare clones skip the working-tree checkout entirely; callers that read
+    blobs straight from the object database never need one.
+    """
+    # The hash only needs to be a deterministic directory name, not
+    # cryptographically strong; blake2b is the fastest digest in hashlib.
+    repo_hash = hashlib.blake2b(
+        (repo_url + (commit_hash or "") + ("|bare" if bare else "")).encode(), digest_size=6
+    ).hexdigest()
     temp_dir = os.path.join(tempfile.gettempdir(), f"github_tools_{repo_hash}")
 
     if os.path.exists(temp_dir):
+        # A single git subprocess is much cheaper than constructing a
+        # git.Repo, which parses the full config and refs on init.
         try:
-            repo = git.Repo(temp_dir)
-            if not repo.bare and repo.remote().url == repo_url:
+            url = subprocess.check_output(
+                ["git", "-C", temp_dir, "config", "--get", "remote.origin.url"],
+                text=True, stderr=subprocess.DEVNULL
+            ).strip()
+            if url == repo_url:
+                head = subprocess.check_output(
+                    ["git", "-C", temp_dir, "rev-parse", "HEAD"],
+                    text=True, stderr=subprocess.DEVNULL
+                ).strip()
                 if commit_hash:
-                    repo.git.checkout(commit_hash)
+                    if head != commit_hash:
+                        # Fetch only when the commit isn't already local,
+                        # then check it out; a full checkout is skipped
+                        # entirely when HEAD already matches.
+                        have_commit = subprocess.run(
+                            ["git", "-C", temp_dir, "cat-file", "-e", commit_hash],
+                            capture_output=True
+                        ).returncode == 0
+                        if not have_commit:
+                            subprocess.run(
+                                ["git", "-C", temp_dir, "fetch", "--depth=1", "origin", commit_hash],
+                                check=True, capture_output=True
+                            )
+                        if not bare:
+                            subprocess.run(
+                                ["git", "-C", temp_dir, "checkout", commit_hash],
+                                check=True, capture_output=True
+                            )
+                else:
+                    # No pinned commit: refresh so repeated calls don't
+                    # serve a stale tree after the remote advances.
+                    subprocess.run(
+                        ["git", "-C", temp_dir, "fetch", "--depth=1", "origin", "HEAD"],
+                        check=True, capture_output=True
+                    )
+                    fetch_head = subprocess.check_output(
+                        ["git", "-C", temp_dir, "rev-parse", "FETCH_HEAD"],
+                        text=True, stderr=subprocess.DEVNULL
+                    ).strip()
+                    if head != fetch_head:
+                        if bare:
+                            subprocess.run(
+                                ["git", "-C", temp_dir, "update-ref", "HEAD", fetch_head],
+                                check=True, capture_output=True
+                            )
+                        else:
+                            subprocess.run(
+                                ["git", "-C", temp_dir, "reset", "--hard", "FETCH_HEAD"],
+                                check=True, capture_output=True
+                            )
                 return temp_dir
-        except:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        except (subprocess.SubprocessError, OSError):
             shutil.rmtree(temp_dir, ignore_errors=True)
 
     os.makedirs(temp_dir, exist_ok=True)
     try:
-        repo = git.Repo.clone_from(repo_url, temp_dir)
-        if commit_hash:
+        if bare:
+            # No working tree at all: the object database is enough for
+            # callers that read blobs via cat-file.
+            repo = git.Repo.clone_from(
+                repo_url, temp_dir,
+                multi_options=["--bare", "--depth=1", "--single-branch"]
+            )
+            if commit_hash:
+                repo.git.fetch("origin", commit_hash, "--depth=1")
+        elif commit_hash:
+            # Clone without history or checkout, then fetch just the commit
+            # we need. Avoids downloading the full history for one tree.
+            repo = git.Repo.clone_from(
+                repo_url, temp_dir,
+                multi_options=["--depth=1", "--single-branch", "--no-checkout"]
+            )
+            repo.git.fetch("origin", commit_hash, "--depth=1")
             repo.git.checkout(commit_hash)
+        else:
+            repo = git.Repo.clone_from(
+                repo_url, temp_dir,
+                multi_options=["--depth=1", "--single-branch"]
+            )
         return temp_dir
     except Exception as e:
         shutil.rmtree(temp_dir, ignore_errors=True)
         raise Exception(f"Failed to clone repository: {str(e)}")
 
-def get_directory_tree(path: str, prefix: str = "") -> str:
-    """Generate a tree-like directory structure string"""
-    output = ""
-    entries = sorted(os.listdir(path))
-    
+# Keyword search runs on raw bytes: no UTF-8 decode needed. All keywords are
+# compiled into one pattern so a file is scanned in a single pass instead of
+# once per keyword.
+MCP_KEYWORDS_BYTES = [b"mcp", b"@modelcontextprotocol", b"mark3labs/mcp-go", b"metoro-io/mcp-golang"]
+_MCP_PATTERN = re.compile(b"|".join(re.escape(kw) for kw in MCP_KEYWORDS_BYTES))
+
+# MCP package references appear near the top of a file (imports, requires),
+# so scanning a bounded head catches them without reading whole files.
+_SCAN_CAP = 65536
+
+# Files beyond this are assumed generated/vendored and skipped outright.
+_SCAN_MAX_FILE = 2 * 1024 * 1024
+
+# Directories pruned from the tree walk, matched by exact name.
+_SKIP_DIRS = frozenset({".git"})
+
+# Files eligible for the MCP keyword scan. Tuples because str.endswith
+# accepts them directly and matches at C level.
+_CODE_EXTS = ('.js', '.mjs', '.cjs', '.jsx', '.py', '.pyw', '.pyi', '.go', '.ts', '.tsx', '.d.ts')
+_README_SUFFIXES = ('readme.md', 'readme.txt', 'readme', 'readme.rst')
+
+
+def _contains_mcp_keyword(path: str, size: int) -> bool:
+    """Scan the head of a file's raw bytes for MCP-related keywords."""
+    if size > _SCAN_MAX_FILE:
+        return False
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(_SCAN_CAP)
+    except OSError:
+        return False  # Skip if file can't be read
+    # A null byte near the start means binary content (e.g. a vendored
+    # artifact with a code-file extension); don't bother searching it.
+    if b'\x00' in head[:8192]:
+        return False
+    return _MCP_PATTERN.search(head) is not None
+
+
+def _walk(path: str, prefix: str = ""):
+    """Yield (line, scan_path, size) for every entry under path.
+
+    scan_path is the file to check for MCP keywords, or None for entries
+    that don't qualify; the scans themselves happen later so they can run
+    in parallel.
+    """
+    # os.scandir returns DirEntry objects whose type and stat info are cached
+    # from the readdir batch, so we avoid extra stat syscalls per entry.
+    with os.scandir(path) as it:
+        entries = sorted(it, key=lambda e: e.name)
+
+    entries = [e for e in entries if e.name not in _SKIP_DIRS]
+
     for i, entry in enumerate(entries):
-        if entry.startswith('.git'):
-            continue
-            
         is_last = i == len(entries) - 1
         current_prefix = "└── " if is_last else "├── "
         next_prefix = "    " if is_last else "│   "
-        
-        entry_path = os.path.join(path, entry)
-        size = os.path.getsize(entry_path) if os.path.isfile(entry_path) else 0
+
+        is_file = entry.is_file(follow_symlinks=False)
+        size = entry.stat().st_size if is_file else 0
         size_str = f" ({size//1000}K)" if size > 1000 else ""
 
-        # Check code files and READMEs for MCP keywords
-        mcp_flag = ""
-        CODE_EXTENSIONS = ('.js', '.mjs', '.cjs', '.jsx', '.py', '.pyw', '.pyi', '.go', '.ts', '.tsx', '.d.ts')
-        if os.path.isfile(entry_path) and (
-            any(entry_path.endswith(ext) for ext in CODE_EXTENSIONS) or 
-            entry.lower().endswith(('readme.md', 'readme.txt', 'readme', 'readme.rst'))
+        # Code files and READMEs qualify for the MCP keyword scan
+        scan_path = None
+        if is_file and (
+            entry.name.endswith(_CODE_EXTS) or
+            entry.name.lower().endswith(_README_SUFFIXES)
         ):
-            try:
-                with open(entry_path, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        if any(keyword in line for keyword in ["mcp", "mcp.server", "@modelcontextprotocol", 
-                                                             "mark3labs/mcp-go", "metoro-io/mcp-golang"]):
-                            mcp_flag = " [MCP]"
-                            break
-            except:
-                pass  # Skip if file can't be read
-        output += f"{prefix}{current_prefix}{entry}{size_str}{mcp_flag}\n"
-        
-        if os.path.isdir(entry_path):
-            output += get_directory_tree(entry_path, prefix + next_prefix)
-            
-    return output
+            scan_path = entry.path
+        yield f"{prefix}{current_prefix}{entry.name}{size_str}", scan_path, size
+
+        if entry.is_dir(follow_symlinks=False):
+            yield from _walk(entry.path, prefix + next_prefix)
+
+
+def get_directory_tree(path: str) -> str:
+    """Generate a tree-like directory structure string"""
+    lines = list(_walk(path))
+    flags = [""] * len(lines)
+    to_scan = [(i, scan_path, size) for i, (_, scan_path, size) in enumerate(lines) if scan_path]
+    if to_scan:
+        # The keyword scans are independent and disk-bound, so overlap them
+        # instead of paying for each file's read latency in sequence.
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            found = executor.map(lambda s: _contains_mcp_keyword(s[1], s[2]), to_scan)
+            for (i, _, _), hit in zip(to_scan, found):
+                if hit:
+                    flags[i] = " [MCP]"
+    return "".join(f"{line}{flag}\n" for (line, _, _), flag in zip(lines, flags))
+
+def _head_sha(repo_path: str) -> str:
+    """Return the commit sha the clone at repo_path currently has checked out."""
+    return git.Repo(repo_path).head.commit.hexsha
+
+# Both tools are idempotent for a fixed commit, so results are memoized with
+# the sha in the key; a new commit at the same path simply misses.
+@lru_cache(maxsize=64)
+def _cached_tree(repo_path: str, commit_sha: str) -> str:
+    return get_directory_tree(repo_path)
+
+@lru_cache(maxsize=64)
+def _tree_blob_oids(repo_path: str, commit_sha: str) -> dict[str, str]:
+    """Map every blob path at a commit to its object id with one ls-tree."""
+    out = subprocess.check_output(
+        ["git", "-C", repo_path, "ls-tree", "-r", "-z", commit_sha]
+    )
+    oids = {}
+    for record in out.split(b"\0"):
+        if not record:
+            continue
+        meta, path = record.split(b"\t", 1)
+        _mode, obj_type, oid = meta.split()
+        if obj_type == b"blob":
+            oids[path.decode('utf-8', errors='replace')] = oid.decode()
+    return oids
+
+@lru_cache(maxsize=64)
+def _cached_read_blobs(repo_path: str, commit_sha: str, rel_paths: tuple) -> dict[str, tuple[str, int]]:
+    """Read blobs straight out of the object database for every path.
+
+    Paths are resolved to object ids up front with a single ls-tree, then
+    one `git cat-file --batch` process serves every blob, so no working
+    tree, checkout, or per-file open() is involved. Returns a dict mapping
+    each path to (content_or_error, blob_size).
+    """
+    # Directories, submodules and absent paths simply aren't in the map;
+    # identical blobs shared by several paths are fetched once.
+    oids = _tree_blob_oids(repo_path, commit_sha)
+    to_fetch = list(dict.fromkeys(oids[rel_path] for rel_path in rel_paths if rel_path in oids))
+
+    blobs_by_oid = {}
+    if to_fetch:
+        proc = subprocess.Popen(
+            ["git", "-C", repo_path, "cat-file", "--batch"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        out, _ = proc.communicate("".join(f"{oid}\n" for oid in to_fetch).encode())
+
+        # Each response is "<oid> <type> <size>\n<data>\n"
+        pos = 0
+        for oid in to_fetch:
+            newline = out.index(b"\n", pos)
+            header = out[pos:newline].decode()
+            pos = newline + 1
+            _oid, _obj_type, size_str = header.split()
+            size = int(size_str)
+            blobs_by_oid[oid] = (out[pos:pos + size].decode('utf-8', errors='replace'), size)
+            pos += size + 1
+
+    return {
+        rel_path: blobs_by_oid[oids[rel_path]] if rel_path in oids else (f"Error: File not found", 0)
+        for rel_path in rel_paths
+    }
+
+DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+
+_client: Optional[OpenAI] = None
+
+def _get_client() -> OpenAI:
+    """Return the shared OpenAI client, creating it on first use.
+
+    One client means one underlying httpx connection pool, so repeated
+    summarization calls reuse TCP+TLS sessions instead of paying a fresh
+    handshake per request.
+    """
+    global _client
+    if _client is None:
+        api_key = os.environ.get("DEEPSEEK_API_KEY")
+        if not api_key:
+            raise RuntimeError("DEEPSEEK_API_KEY is not set")
+        _client = OpenAI(api_key=api_key, base_url=DEEPSEEK_BASE_URL)
+    return _client
+
+# Cap on the combined file contents per summarization request; anything
+# beyond this is split into further batches summarized concurrently.
+_MAX_SUMMARY_BATCH_BYTES = 512 * 1024
+
+def _summarize_batch(client: OpenAI, files: dict[str, str]) -> dict[str, str]:
+    """Summarize a batch of files with a single chat completion.
+
+    The batch is concatenated into one sentinel-delimited request so N
+    files cost one network round trip instead of N, and the per-file
+    summaries are parsed back out of the delimited response.
+    """
+    system_prompt = (
+        DEFAULT_SUMMARY_PROMPT
+        + '\n\nYou will receive several files, each introduced by a line of the form'
+        ' "=== FILE: <path> ===". Analyze each file separately, introducing each'
+        ' analysis with a matching line "=== SUMMARY: <path> ===".'
+    )
+    user_content = "\n".join(
+        f"=== FILE: {path} ===\n{content}" for path, content in files.items()
+    )
+    response = client.chat.completions.create(
+        model="deepseek-chat",
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content},
+        ],
+    )
+    text = response.choices[0].message.content
+    summaries = {}
+    for path in files:
+        marker = f"=== SUMMARY: {path} ==="
+        start = text.find(marker)
+        if start == -1:
+            continue
+        start += len(marker)
+        end = text.find("=== SUMMARY: ", start)
+        summaries[path] = text[start:end if end != -1 else len(text)].strip()
+    return summaries
+
+def _summarize_files(files: dict[str, str]) -> dict[str, str]:
+    """Summarize files, splitting oversized payloads into concurrent batches."""
+    client = _get_client()
+
+    batches = []
+    current, current_size = {}, 0
+    for path, content in files.items():
+        if current and current_size + len(content) > _MAX_SUMMARY_BATCH_BYTES:
+            batches.append(current)
+            current, current_size = {}, 0
+        current[path] = content
+        current_size += len(content)
+    if current:
+        batches.append(current)
+
+    if len(batches) == 1:
+        return _summarize_batch(client, batches[0])
+
+    # The OpenAI client is synchronous but thread-safe; batches are
+    # independent so their round trips can overlap.
+    summaries = {}
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for batch_summaries in executor.map(lambda b: _summarize_batch(client, b), batches):
+            summaries.update(batch_summaries)
+    return summaries
 
 @mcp.tool()
-def git_directory_structure(repo_url: str, commit_hash: str = None) -> str:
+async def git_directory_structure(repo_url: str, commit_hash: str = None) -> str:
     """
     Clone a Git repository and return its directory structure in a tree format.
     
@@ -101,48 +383,81 @@ def git_directory_structure(repo_url: str, commit_hash: str = None) -> str:
         A string representation of the repository's directory structure with size and MCP annotations
     """
     try:
-        # Clone the repository
-        repo_path = clone_repo(repo_url, commit_hash)
-        
+        # Clone and walk off the event loop so other tool calls can run
+        # during the network and disk waits
+        repo_path = await asyncio.to_thread(clone_repo, repo_url, commit_hash)
+
         # Generate the directory tree
-        tree = get_directory_tree(repo_path)
+        commit_sha = await asyncio.to_thread(_head_sha, repo_path)
+        tree = await asyncio.to_thread(_cached_tree, repo_path, commit_sha)
         return tree
             
     except Exception as e:
         return f"Error: {str(e)}"
 
 @mcp.tool()
-def git_read_important_files(repo_url: str, file_paths: List[str], commit_hash: str = None) -> dict[str, str]:
+async def git_read_important_files(repo_url: str, file_paths: List[str], commit_hash: str = None,
+                                   summarize_threshold: int = None) -> dict[str, str]:
     """
     Read the contents of specified files in a given git repository.
-    
+
     Args:
         repo_url: The URL of the Git repository
         file_paths: List of file paths to read (relative to repository root)
         commit_hash: Optional specific commit hash to checkout
-        
+        summarize_threshold: Optional size in bytes above which a file's
+            contents are replaced by an LLM-generated summary (requires
+            DEEPSEEK_API_KEY to be set)
+
     Returns:
-        A dictionary mapping file paths to their contents
+        A dictionary mapping file paths to their contents or summaries
     """
     try:
-        # Clone the repository
-        repo_path = clone_repo(repo_url, commit_hash)
+        # Clone the repository; a bare clone suffices since contents are
+        # read straight from the object database. Blocking steps run via
+        # to_thread so the event loop can serve other tool calls meanwhile.
+        repo_path = await asyncio.to_thread(clone_repo, repo_url, commit_hash, bare=True)
+        commit_sha = commit_hash or await asyncio.to_thread(_head_sha, repo_path)
+
+        # Normalize paths so duplicates and equivalent spellings
+        # ("./foo.py" vs "foo.py") are read once, and reject anything
+        # pointing outside the repository.
         results = {}
-        
+        sizes = {}
+        requested_by_path: dict[str, list[str]] = {}
         for file_path in file_paths:
-            full_path = os.path.join(repo_path, file_path)
-            
-            # Check if file exists
-            if not os.path.isfile(full_path):
-                results[file_path] = f"Error: File not found"
+            rel_path = posixpath.normpath(file_path)
+            if posixpath.isabs(rel_path) or rel_path.split("/", 1)[0] == "..":
+                results[file_path] = f"Error: Path outside repository"
                 continue
-                
-            try:
-                with open(full_path, 'r', encoding='utf-8') as f:
-                    results[file_path] = f.read()
-            except Exception as e:
-                results[file_path] = f"Error reading file: {str(e)}"
-        
+            requested_by_path.setdefault(rel_path, []).append(file_path)
+
+        if requested_by_path:
+            blobs = await asyncio.to_thread(
+                _cached_read_blobs, repo_path, commit_sha, tuple(sorted(requested_by_path))
+            )
+            for rel_path, requested in requested_by_path.items():
+                content, size = blobs[rel_path]
+                for file_path in requested:
+                    results[file_path] = content
+                    sizes[file_path] = size
+
+        if summarize_threshold is not None and os.environ.get("DEEPSEEK_API_KEY"):
+            # Blob sizes from the cat-file headers decide what to summarize;
+            # re-encoding the decoded contents just to measure them would
+            # double peak memory.
+            files_to_summarize = {
+                fp: content for fp, content in results.items()
+                if not content.startswith("Error") and sizes.get(fp, 0) > summarize_threshold
+            }
+            if files_to_summarize:
+                try:
+                    summaries = await asyncio.to_thread(_summarize_files, files_to_summarize)
+                    for fp, summary in summaries.items():
+                        results[fp] = summary
+                except Exception:
+                    pass  # Fall back to raw contents if summarization fails
+
         return results
             
             